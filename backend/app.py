@@ -1,11 +1,31 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g, has_request_context
 from flask_cors import CORS
 import requests
 import os
+import io
+import json
+import gzip
+import hashlib
+import hmac
+import math
+import random
+import threading
+import time
+import uuid
+import cProfile
+import pstats
+from collections import OrderedDict, deque, namedtuple
+from contextlib import contextmanager
+from functools import lru_cache
 from dotenv import load_dotenv
 from datetime import datetime
 import logging
 
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
 load_dotenv()
 
 app = Flask(__name__)
@@ -76,6 +96,334 @@ EMOTION_FEATURES = {
     }
 }
 
+# Blended emotion vectors are quantized to multiples of 1/EMOTION_QUANTA so that
+# nearby probability distributions share the same target features (and cache keys)
+EMOTION_QUANTA = int(os.getenv('EMOTION_QUANTA', '4'))
+BLENDED_ATTRIBUTES = ('valence', 'energy', 'danceability', 'acousticness')
+
+# Audio feature parameters forwarded to Spotify's recommendations endpoint
+AUDIO_FEATURE_PARAMS = (
+    'min_valence', 'max_valence', 'target_valence',
+    'min_energy', 'max_energy', 'target_energy',
+    'target_danceability', 'target_acousticness'
+)
+
+
+def quantize_emotion_vector(vector):
+    """Round a probability vector to EMOTION_QUANTA units per emotion.
+
+    Uses largest-remainder rounding so the units always sum to EMOTION_QUANTA.
+    Emotion names are case-insensitive. Returns a tuple aligned with
+    EMOTION_FEATURES, or None if the vector is unusable or has non-numeric weights.
+    """
+    if not isinstance(vector, dict):
+        return None
+
+    raw = {}
+    for emotion, value in vector.items():
+        # bool is an int subclass, but True is not a probability
+        if not isinstance(emotion, str) or isinstance(value, bool) or not isinstance(value, (int, float)):
+            return None
+        raw[emotion.lower()] = raw.get(emotion.lower(), 0) + value
+
+    weights = []
+    for emotion in EMOTION_FEATURES:
+        try:
+            weight = float(raw.get(emotion, 0))
+        except OverflowError:
+            return None
+        weights.append(weight if math.isfinite(weight) and weight > 0 else 0.0)
+
+    largest = max(weights)
+    if largest <= 0:
+        return None
+
+    # Normalize by the largest weight first so huge inputs can't sum to inf
+    weights = [w / largest for w in weights]
+    total = sum(weights)
+    scaled = [w / total * EMOTION_QUANTA for w in weights]
+    units = [int(x) for x in scaled]
+    # Ties go to the emotion listed first so the result is deterministic
+    by_remainder = sorted(range(len(scaled)), key=lambda i: (units[i] - scaled[i], i))
+    for i in by_remainder[:EMOTION_QUANTA - sum(units)]:
+        units[i] += 1
+    return tuple(units)
+
+
+def emotion_vector_payload(quantized):
+    """Response fields describing the quantized vector a blended query used"""
+    if not quantized:
+        return {}
+    return {
+        'emotion_vector': {
+            emotion: units / EMOTION_QUANTA
+            for emotion, units in zip(EMOTION_FEATURES, quantized) if units
+        },
+        'emotion_quanta': EMOTION_QUANTA
+    }
+
+
+def dominant_emotion(quantized):
+    """Emotion holding the most units in a quantized vector"""
+    emotions = list(EMOTION_FEATURES)
+    return emotions[quantized.index(max(quantized))]
+
+
+def _feature_preference(features, attribute):
+    """Single preferred value for an attribute, from its target or min/max range"""
+    if f'target_{attribute}' in features:
+        return features[f'target_{attribute}']
+    if f'min_{attribute}' in features or f'max_{attribute}' in features:
+        return (features.get(f'min_{attribute}', 0.0) + features.get(f'max_{attribute}', 1.0)) / 2
+    return None
+
+
+@lru_cache(maxsize=512)
+def blend_emotion_features(quantized):
+    """Weighted blend of EMOTION_FEATURES for a quantized emotion vector"""
+    dominant = dominant_emotion(quantized)
+    if max(quantized) == EMOTION_QUANTA:
+        # A single emotion: identical to the plain argmax query
+        return EMOTION_FEATURES[dominant]
+
+    blended = {
+        'genres': EMOTION_FEATURES[dominant]['genres'],
+        'moods': EMOTION_FEATURES[dominant]['moods']
+    }
+    for attribute in BLENDED_ATTRIBUTES:
+        weighted = 0.0
+        covered = 0
+        for emotion, units in zip(EMOTION_FEATURES, quantized):
+            preference = _feature_preference(EMOTION_FEATURES[emotion], attribute)
+            if units and preference is not None:
+                weighted += preference * units
+                covered += units
+        # Only steer an attribute the bulk of the distribution has an opinion on
+        if covered * 2 >= EMOTION_QUANTA:
+            blended[f'target_{attribute}'] = round(weighted / covered, 2)
+    return blended
+
+
+# Opt-in request profiling. A PROFILE_SAMPLE_RATE fraction of requests, plus any
+# request sending X-Debug-Profile with a valid X-Admin-Token, records a span tree
+# (and a cProfile report when PROFILE_MODE or the header asks for 'cprofile').
+# Traces are kept in memory and served from /api/admin/profiles.
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_MODE = os.getenv('PROFILE_MODE', 'spans')
+PROFILE_HISTORY = int(os.getenv('PROFILE_HISTORY', '50'))
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+_profiles = deque(maxlen=PROFILE_HISTORY)
+_profiles_lock = threading.Lock()
+# Only one cProfile profiler can be active per interpreter
+_cprofile_lock = threading.Lock()
+
+
+def _is_admin():
+    # Compare bytes: compare_digest raises on non-ASCII str arguments. WSGI
+    # decodes header bytes as latin-1, so encoding back recovers what was sent
+    supplied = request.headers.get('X-Admin-Token', '').encode('latin-1', errors='replace')
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(supplied, ADMIN_TOKEN.encode())
+
+
+@contextmanager
+def profile_span(name):
+    """Record a timed child span on the current request's trace, if it has one"""
+    trace = g.get('profile_trace') if has_request_context() else None
+    if trace is None:
+        yield
+        return
+
+    parent = trace['stack'][-1]
+    span = {
+        'name': name,
+        'start_ms': round((time.perf_counter() - trace['started']) * 1000, 3),
+        'children': []
+    }
+    parent['children'].append(span)
+    trace['stack'].append(span)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        span['duration_ms'] = round((time.perf_counter() - start) * 1000, 3)
+        trace['stack'].pop()
+
+
+@app.before_request
+def start_profile():
+    """Start a trace for sampled requests or admin debug requests"""
+    debug_mode = request.headers.get('X-Debug-Profile')
+    sampled = False
+    if debug_mode and _is_admin():
+        mode = debug_mode.lower()
+    elif PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+        mode = PROFILE_MODE
+        sampled = True
+    else:
+        return
+
+    root = {'name': f"{request.method} {request.path}", 'start_ms': 0.0, 'children': []}
+    g.profile_trace = {
+        'id': uuid.uuid4().hex[:12],
+        'timestamp': datetime.utcnow().isoformat(),
+        'sampled': sampled,
+        'mode': mode,
+        'cprofile_skipped': False,
+        'root': root,
+        'stack': [root],
+        'profiler': None,
+        'started': time.perf_counter()
+    }
+    if mode == 'cprofile':
+        if _cprofile_lock.acquire(blocking=False):
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+                g.profile_trace['profiler'] = profiler
+            except ValueError:
+                # Another tool already owns the interpreter's profiling hook
+                _cprofile_lock.release()
+        # Busy with another request's cProfile: fall back to spans only, visibly
+        g.profile_trace['cprofile_skipped'] = g.profile_trace['profiler'] is None
+
+
+@app.teardown_request
+def finish_profile(error=None):
+    """Close the trace and store it for the admin endpoint"""
+    trace = g.pop('profile_trace', None)
+    if trace is None:
+        return
+
+    duration = (time.perf_counter() - trace['started']) * 1000
+    report = None
+    profiler = trace['profiler']
+    if profiler is not None:
+        profiler.disable()
+        _cprofile_lock.release()
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(30)
+        report = stream.getvalue()
+
+    trace['root']['duration_ms'] = round(duration, 3)
+    with _profiles_lock:
+        _profiles.append({
+            'id': trace['id'],
+            'timestamp': trace['timestamp'],
+            'sampled': trace['sampled'],
+            'mode': trace['mode'],
+            'cprofile_skipped': trace['cprofile_skipped'],
+            'error': str(error) if error else None,
+            'duration_ms': round(duration, 3),
+            'spans': trace['root'],
+            'cprofile': report
+        })
+
+
+# Upstream conditional-request cache: Spotify responses are stored with their
+# ETag and revalidated with If-None-Match, so a 304 reuses the stored body.
+SPOTIFY_CACHE_SIZE = int(os.getenv('SPOTIFY_CACHE_SIZE', '256'))
+_spotify_cache = OrderedDict()
+_spotify_cache_lock = threading.Lock()
+
+# Our own responses: compressed above this many bytes, with per-route Cache-Control
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+CACHE_CONTROL = {
+    '/api/spotify/client-id': 'public, max-age=3600',
+    '/api/health': 'no-cache',
+    '/api/spotify/devices': 'private, no-cache',
+}
+
+
+def _spotify_cache_key(url, headers, params):
+    """Cache key scoped to the user's token so private data is never shared"""
+    token = hashlib.sha256(headers.get('Authorization', '').encode()).hexdigest()
+    return (token, url, tuple(sorted((params or {}).items())))
+
+
+class CachedResponse(namedtuple('CachedResponse', ['status_code', 'headers', 'content'])):
+    """Immutable snapshot of a Spotify response, safe to share between requests"""
+    __slots__ = ()
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+
+def spotify_get(url, headers, params=None):
+    """GET a Spotify endpoint, revalidating any cached copy with its ETag"""
+    key = _spotify_cache_key(url, headers, params)
+    with _spotify_cache_lock:
+        cached = _spotify_cache.get(key)
+
+    request_headers = dict(headers)
+    if cached:
+        request_headers['If-None-Match'] = cached[0]
+
+    with profile_span(f"spotify GET {url.replace('https://api.spotify.com', '')}"):
+        response = requests.get(url, headers=request_headers, params=params)
+
+    if response.status_code == 304 and cached:
+        with _spotify_cache_lock:
+            if key in _spotify_cache:
+                _spotify_cache.move_to_end(key)
+        return cached[1]
+
+    etag = response.headers.get('ETag')
+    with _spotify_cache_lock:
+        if response.status_code == 200 and etag:
+            # Keep only what callers read, not the transport or the prepared
+            # request carrying the bearer token
+            snapshot = CachedResponse(response.status_code, dict(response.headers), response.content)
+            _spotify_cache[key] = (etag, snapshot)
+            _spotify_cache.move_to_end(key)
+            while len(_spotify_cache) > SPOTIFY_CACHE_SIZE:
+                _spotify_cache.popitem(last=False)
+        else:
+            _spotify_cache.pop(key, None)
+    return response
+
+
+def _negotiate_encoding():
+    """Pick the best compression the client accepts (brotli, then gzip)"""
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+@app.after_request
+def add_caching_and_compression(response):
+    """Compress large responses and attach ETag/Cache-Control to GET responses"""
+    if response.direct_passthrough or response.status_code != 200:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = _negotiate_encoding()
+    if (encoding and 'Content-Encoding' not in response.headers
+            and response.content_length is not None
+            and response.content_length >= COMPRESSION_MIN_SIZE):
+        body = response.get_data()
+        if encoding == 'br':
+            body = brotli.compress(body)
+        else:
+            # mtime=0 keeps the output (and therefore the ETag) deterministic
+            body = gzip.compress(body, mtime=0)
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+
+    if request.method in ('GET', 'HEAD'):
+        response.headers.setdefault('Cache-Control', CACHE_CONTROL.get(request.path, 'private, no-cache'))
+        if not response.get_etag()[0]:
+            response.add_etag()
+        response.make_conditional(request)
+    return response
+
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     return jsonify({'status': 'healthy', 'timestamp': datetime.utcnow().isoformat()}), 200
@@ -92,6 +440,11 @@ def get_recommendations():
     emotion = data.get('emotion', 'neutral').lower()
     access_token = data.get('access_token')
     
+    # Optional probability vector, e.g. {"happy": 0.7, "neutral": 0.3}
+    emotion_vector = quantize_emotion_vector(data.get('emotions'))
+    if emotion_vector:
+        emotion = dominant_emotion(emotion_vector)
+    
     print(f"Getting recommendations for emotion: {emotion}")  # Debug
     
     if not access_token:
@@ -103,7 +456,7 @@ def get_recommendations():
     
     try:
         # Test if token is valid
-        test_response = requests.get('https://api.spotify.com/v1/me', headers=headers)
+        test_response = spotify_get('https://api.spotify.com/v1/me', headers)
         if test_response.status_code != 200:
             print(f"Token validation failed: {test_response.status_code}")
             return jsonify({'error': 'Invalid access token'}), 401
@@ -111,9 +464,9 @@ def get_recommendations():
         # Get user's top tracks for seed
         print("Getting user's top tracks...")
         top_tracks_url = 'https://api.spotify.com/v1/me/top/tracks'
-        top_tracks_response = requests.get(
-            top_tracks_url, 
-            headers=headers,
+        top_tracks_response = spotify_get(
+            top_tracks_url,
+            headers,
             params={'limit': 5, 'time_range': 'short_term'}
         )
         
@@ -121,7 +474,8 @@ def get_recommendations():
         seed_artists = []
         
         if top_tracks_response.status_code == 200:
-            top_tracks = top_tracks_response.json()
+            with profile_span('parse top tracks'):
+                top_tracks = top_tracks_response.json()
             print(f"Found {len(top_tracks.get('items', []))} top tracks")
             
             # Get up to 2 seed tracks
@@ -137,9 +491,9 @@ def get_recommendations():
         if len(seed_artists) < 2:
             print("Getting user's top artists...")
             top_artists_url = 'https://api.spotify.com/v1/me/top/artists'
-            top_artists_response = requests.get(
+            top_artists_response = spotify_get(
                 top_artists_url,
-                headers=headers,
+                headers,
                 params={'limit': 3, 'time_range': 'short_term'}
             )
             
@@ -150,7 +504,10 @@ def get_recommendations():
                         seed_artists.append(artist['id'])
         
         # Get emotion-based music features
-        features = EMOTION_FEATURES.get(emotion, EMOTION_FEATURES['neutral'])
+        if emotion_vector:
+            features = blend_emotion_features(emotion_vector)
+        else:
+            features = EMOTION_FEATURES.get(emotion, EMOTION_FEATURES['neutral'])
         
         # Build recommendation parameters
         rec_params = {
@@ -170,29 +527,21 @@ def get_recommendations():
             rec_params['seed_genres'] = ','.join(features['genres'][:2])
         
         # Add audio features for emotion
-        if 'min_valence' in features:
-            rec_params['min_valence'] = features['min_valence']
-        if 'max_valence' in features:
-            rec_params['max_valence'] = features['max_valence']
-        if 'min_energy' in features:
-            rec_params['min_energy'] = features['min_energy']
-        if 'max_energy' in features:
-            rec_params['max_energy'] = features['max_energy']
-        if 'target_danceability' in features:
-            rec_params['target_danceability'] = features['target_danceability']
-        if 'target_acousticness' in features:
-            rec_params['target_acousticness'] = features['target_acousticness']
+        for param in AUDIO_FEATURE_PARAMS:
+            if param in features:
+                rec_params[param] = features[param]
         
         print(f"Recommendation params: {rec_params}")
         
         # Get recommendations from Spotify
         recommendations_url = 'https://api.spotify.com/v1/recommendations'
-        rec_response = requests.get(recommendations_url, headers=headers, params=rec_params)
+        rec_response = spotify_get(recommendations_url, headers, params=rec_params)
         
         print(f"Recommendations response status: {rec_response.status_code}")
         
         if rec_response.status_code == 200:
-            recommendations = rec_response.json()
+            with profile_span('parse recommendations'):
+                recommendations = rec_response.json()
             tracks = recommendations.get('tracks', [])
             
             if tracks:
@@ -200,41 +549,44 @@ def get_recommendations():
                 track_list = []
                 track_uris = []
                 
-                for track in tracks[:10]:  # Limit to 10 tracks
-                    if track and 'id' in track:
-                        track_info = {
-                            'id': track['id'],
-                            'name': track.get('name', 'Unknown'),
-                            'artist': track['artists'][0]['name'] if track.get('artists') and len(track['artists']) > 0 else 'Unknown',
-                            'uri': track.get('uri', ''),
-                            'preview_url': track.get('preview_url'),
-                            'image': track.get('album', {}).get('images', [{}])[0].get('url') if track.get('album', {}).get('images') else None
-                        }
-                        track_list.append(track_info)
-                        track_uris.append(track['uri'])
+                with profile_span('normalize recommendations'):
+                    for track in tracks[:10]:  # Limit to 10 tracks
+                        if track and 'id' in track:
+                            track_info = {
+                                'id': track['id'],
+                                'name': track.get('name', 'Unknown'),
+                                'artist': track['artists'][0]['name'] if track.get('artists') and len(track['artists']) > 0 else 'Unknown',
+                                'uri': track.get('uri', ''),
+                                'preview_url': track.get('preview_url'),
+                                'image': track.get('album', {}).get('images', [{}])[0].get('url') if track.get('album', {}).get('images') else None
+                            }
+                            track_list.append(track_info)
+                            track_uris.append(track['uri'])
                 
                 if track_list:
-                    return jsonify({
+                    result = {
                         'emotion': emotion,
                         'tracks': track_list,
                         'track_uris': track_uris,
                         'features_used': features,
                         'playlist_name': f"{emotion.capitalize()} Mood - Personalized"
-                    }), 200
+                    }
+                    result.update(emotion_vector_payload(emotion_vector))
+                    return jsonify(result), 200
         else:
             print(f"Recommendations failed: {rec_response.status_code} - {rec_response.text}")
         
         # Fallback: Search for playlists if recommendations fail
         print("Falling back to playlist search...")
-        return search_mood_playlists(emotion, headers)
+        return search_mood_playlists(emotion, headers, emotion_vector)
         
     except Exception as e:
         logger.error(f"Error getting recommendations: {str(e)}")
         import traceback
         traceback.print_exc()
         # Fallback to playlist search
-        return search_mood_playlists(emotion, headers)
-def search_mood_playlists(emotion, headers):
+        return search_mood_playlists(emotion, headers, emotion_vector)
+def search_mood_playlists(emotion, headers, emotion_vector=None):
     """Fallback: Search for mood-based playlists"""
     try:
         features = EMOTION_FEATURES.get(emotion, EMOTION_FEATURES['neutral'])
@@ -249,12 +601,13 @@ def search_mood_playlists(emotion, headers):
         
         print(f"Searching for playlists with query: {search_query}")  # Debug
         
-        search_response = requests.get(search_url, headers=headers, params=search_params)
+        search_response = spotify_get(search_url, headers, params=search_params)
         
         print(f"Search response status: {search_response.status_code}")  # Debug
         
         if search_response.status_code == 200:
-            results = search_response.json()
+            with profile_span('parse playlist search'):
+                results = search_response.json()
             print(f"Search results keys: {results.keys()}")  # Debug
             
             # Add null checks here
@@ -292,12 +645,13 @@ def search_mood_playlists(emotion, headers):
             
             # Get tracks from the valid playlist
             tracks_url = f"https://api.spotify.com/v1/playlists/{valid_playlist['id']}/tracks"
-            tracks_response = requests.get(tracks_url, headers=headers, params={'limit': 20})
+            tracks_response = spotify_get(tracks_url, headers, params={'limit': 20})
             
             print(f"Tracks response status: {tracks_response.status_code}")  # Debug
             
             if tracks_response.status_code == 200:
-                playlist_tracks = tracks_response.json()
+                with profile_span('parse playlist tracks'):
+                    playlist_tracks = tracks_response.json()
                 
                 if 'items' not in playlist_tracks or playlist_tracks['items'] is None:
                     print("No items in playlist tracks response")
@@ -306,57 +660,58 @@ def search_mood_playlists(emotion, headers):
                 tracks = []
                 track_uris = []
                 
-                for item in playlist_tracks.get('items', []):
-                    # Multiple null checks for each item
-                    if (item is None or 
-                        'track' not in item or 
-                        item['track'] is None or
-                        not isinstance(item['track'], dict)):
-                        continue
+                with profile_span('normalize playlist tracks'):
+                    for item in playlist_tracks.get('items', []):
+                        # Multiple null checks for each item
+                        if (item is None or 
+                            'track' not in item or 
+                            item['track'] is None or
+                            not isinstance(item['track'], dict)):
+                            continue
                         
-                    track = item['track']
+                        track = item['track']
                     
-                    # Check if track has required fields
-                    if (not track.get('id') or 
-                        not track.get('name') or 
-                        not track.get('uri')):
-                        continue
+                        # Check if track has required fields
+                        if (not track.get('id') or 
+                            not track.get('name') or 
+                            not track.get('uri')):
+                            continue
                     
-                    # Get artist name safely
-                    artist_name = 'Unknown'
-                    if (track.get('artists') and 
-                        isinstance(track['artists'], list) and 
-                        len(track['artists']) > 0 and
-                        track['artists'][0] is not None and
-                        isinstance(track['artists'][0], dict)):
-                        artist_name = track['artists'][0].get('name', 'Unknown')
+                        # Get artist name safely
+                        artist_name = 'Unknown'
+                        if (track.get('artists') and 
+                            isinstance(track['artists'], list) and 
+                            len(track['artists']) > 0 and
+                            track['artists'][0] is not None and
+                            isinstance(track['artists'][0], dict)):
+                            artist_name = track['artists'][0].get('name', 'Unknown')
                     
-                    # Get album image safely
-                    image_url = None
-                    if (track.get('album') and 
-                        isinstance(track['album'], dict) and
-                        track['album'].get('images') and
-                        isinstance(track['album']['images'], list) and
-                        len(track['album']['images']) > 0 and
-                        track['album']['images'][0] is not None and
-                        isinstance(track['album']['images'][0], dict)):
-                        image_url = track['album']['images'][0].get('url')
+                        # Get album image safely
+                        image_url = None
+                        if (track.get('album') and 
+                            isinstance(track['album'], dict) and
+                            track['album'].get('images') and
+                            isinstance(track['album']['images'], list) and
+                            len(track['album']['images']) > 0 and
+                            track['album']['images'][0] is not None and
+                            isinstance(track['album']['images'][0], dict)):
+                            image_url = track['album']['images'][0].get('url')
                     
-                    track_info = {
-                        'id': track['id'],
-                        'name': track['name'],
-                        'artist': artist_name,
-                        'uri': track['uri'],
-                        'preview_url': track.get('preview_url'),
-                        'image': image_url
-                    }
+                        track_info = {
+                            'id': track['id'],
+                            'name': track['name'],
+                            'artist': artist_name,
+                            'uri': track['uri'],
+                            'preview_url': track.get('preview_url'),
+                            'image': image_url
+                        }
                     
-                    tracks.append(track_info)
-                    track_uris.append(track['uri'])
+                        tracks.append(track_info)
+                        track_uris.append(track['uri'])
                     
-                    # Stop after getting 10 valid tracks
-                    if len(tracks) >= 10:
-                        break
+                        # Stop after getting 10 valid tracks
+                        if len(tracks) >= 10:
+                            break
                 
                 if tracks:
                     print(f"Successfully found {len(tracks)} valid tracks")
@@ -365,7 +720,8 @@ def search_mood_playlists(emotion, headers):
                         'tracks': tracks,
                         'track_uris': track_uris,
                         'playlist_name': valid_playlist.get('name', f"{emotion.capitalize()} Mood"),
-                        'source': 'playlist_search'
+                        'source': 'playlist_search',
+                        **emotion_vector_payload(emotion_vector)
                     }), 200
                 else:
                     print("No valid tracks found in playlist")
@@ -405,7 +761,7 @@ def play_tracks():
     try:
         # Get available devices
         devices_url = 'https://api.spotify.com/v1/me/player/devices'
-        devices_response = requests.get(devices_url, headers=headers)
+        devices_response = spotify_get(devices_url, headers)
         
         if devices_response.status_code == 200:
             devices = devices_response.json().get('devices', [])
@@ -492,7 +848,7 @@ def get_devices():
     
     try:
         devices_url = 'https://api.spotify.com/v1/me/player/devices'
-        response = requests.get(devices_url, headers=headers)
+        response = spotify_get(devices_url, headers)
         
         if response.status_code == 200:
             return jsonify(response.json()), 200
@@ -503,6 +859,40 @@ def get_devices():
         logger.error(f"Error getting devices: {str(e)}")
         return jsonify({'devices': []}), 200
 
+@app.route('/api/admin/profiles', methods=['GET'])
+def list_profiles():
+    """List captured request profiles, newest first"""
+    if not _is_admin():
+        return jsonify({'error': 'Not found'}), 404
+
+    with _profiles_lock:
+        profiles = list(_profiles)
+    return jsonify({
+        'sample_rate': PROFILE_SAMPLE_RATE,
+        'profiles': [{
+            'id': p['id'],
+            'timestamp': p['timestamp'],
+            'request': p['spans']['name'],
+            'duration_ms': p['duration_ms'],
+            'sampled': p['sampled'],
+            'mode': p['mode'],
+            'has_cprofile': p['cprofile'] is not None,
+            'cprofile_skipped': p['cprofile_skipped']
+        } for p in reversed(profiles)]
+    }), 200
+
+@app.route('/api/admin/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """Return one captured profile with its span tree and cProfile report"""
+    if not _is_admin():
+        return jsonify({'error': 'Not found'}), 404
+
+    with _profiles_lock:
+        profile = next((p for p in _profiles if p['id'] == profile_id), None)
+    if profile is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    return jsonify(profile), 200
+
 @app.route('/api/user/preferences', methods=['POST'])
 def save_preferences():
     """Save user's music preferences for better recommendations"""
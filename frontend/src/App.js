@@ -8,6 +8,34 @@ const REDIRECT_URI = 'http://127.0.0.1:3000/callback';
 const SCOPES = 'user-read-private user-read-email user-modify-playback-state user-read-playback-state user-top-read streaming';
 const API_URL = process.env.REACT_APP_API_URL || 'http://localhost:5000';
 
+// Same order as the backend's EMOTION_FEATURES, so quantized keys line up
+const EMOTION_ORDER = ['happy', 'sad', 'angry', 'relaxed', 'surprised', 'fearful', 'disgusted', 'neutral'];
+
+// Mirror of the backend's largest-remainder quantization: the key of the
+// cached blend a distribution maps to, e.g. "2,1,0,0,0,0,0,1"
+const quantizeEmotions = (emotions, quanta) => {
+  const weights = EMOTION_ORDER.map(emotion => Math.max(emotions[emotion] || 0, 0));
+  const largest = Math.max(...weights);
+  if (!(largest > 0)) return null;
+  const normalized = weights.map(weight => weight / largest);
+  const total = normalized.reduce((sum, weight) => sum + weight, 0);
+  const scaled = normalized.map(weight => weight / total * quanta);
+  const units = scaled.map(Math.floor);
+  const order = scaled
+    .map((value, i) => i)
+    .sort((a, b) => (units[a] - scaled[a]) - (units[b] - scaled[b]) || a - b);
+  let remaining = quanta - units.reduce((sum, unit) => sum + unit, 0);
+  for (const i of order) {
+    if (remaining-- <= 0) break;
+    units[i] += 1;
+  }
+  return units.join(',');
+};
+
+// Key of an emotion_vector returned by the backend ({emotion: units / quanta})
+const emotionVectorKey = (vector, quanta) =>
+  EMOTION_ORDER.map(emotion => Math.round((vector[emotion] || 0) * quanta)).join(',');
+
 const EmotionMusicApp = () => {
   const [clientId, setClientId] = useState('');
   const [accessToken, setAccessToken] = useState(null);
@@ -31,6 +59,9 @@ const EmotionMusicApp = () => {
   const webcamRef = useRef(null);
   const detectionIntervalRef = useRef(null);
   const canvasRef = useRef(null);
+  // Quantization step reported by the backend, and the key of the last blend sent
+  const emotionQuantaRef = useRef(null);
+  const lastEmotionKeyRef = useRef(null);
   const exchangeCodeForToken = async (code) => {
     try {
       setLoading(true);
@@ -219,10 +250,15 @@ useEffect(() => {
           'disgusted': 'disgusted'
         };
         
+        // Full distribution, sent so the backend can blend emotions
+        const emotions = {};
+        
         for (const [emotion, confidence] of Object.entries(expressions)) {
+          const mapped = emotionMapping[emotion] || 'neutral';
+          emotions[mapped] = (emotions[mapped] || 0) + confidence;
           if (confidence > maxConfidence) {
             maxConfidence = confidence;
-            maxEmotion = emotionMapping[emotion] || 'neutral';
+            maxEmotion = mapped;
           }
         }
         
@@ -241,7 +277,7 @@ useEffect(() => {
           model.draw.drawFaceLandmarks(canvas, resizedDetections);
         }
         
-        return { emotion: maxEmotion, confidence: maxConfidence };
+        return { emotion: maxEmotion, confidence: maxConfidence, emotions };
       }
     } catch (error) {
       console.error('Error detecting emotion:', error);
@@ -283,8 +319,9 @@ useEffect(() => {
         // Detection loop
         detectionIntervalRef.current = setInterval(async () => {
           const result = await detectEmotion();
+          if (!result) return;
           
-          if (result && result.confidence > 0.5) {
+          if (result.confidence > 0.5) {
             setEmotionConfidence(result.confidence);
             
             // Update emotion history
@@ -294,11 +331,15 @@ useEffect(() => {
             if (result.emotion !== currentEmotion) {
               setPreviousEmotion(currentEmotion);
               setCurrentEmotion(result.emotion);
-              
-              // Auto-play music if enabled and emotion is stable
-              if (autoPlay && result.confidence > 0.7) {
-                fetchAndPlayMusic(result.emotion);
-              }
+            }
+            
+            // Auto-play if enabled and emotion is stable, whenever the blend the
+            // backend would use changes (the argmax until its quantization is known)
+            const quanta = emotionQuantaRef.current;
+            const key = quanta ? quantizeEmotions(result.emotions, quanta) : result.emotion;
+            if (autoPlay && result.confidence > 0.7 && key && key !== lastEmotionKeyRef.current) {
+              lastEmotionKeyRef.current = key;
+              fetchAndPlayMusic(result.emotion, result.emotions);
             }
           }
         }, 2000); // Check every 2 seconds
@@ -318,7 +359,7 @@ useEffect(() => {
   };
 
   // Fetch personalized music based on emotion
-  const fetchAndPlayMusic = async (emotion) => {
+  const fetchAndPlayMusic = async (emotion, emotions = null) => {
     try {
       setLoading(true);
       
@@ -327,6 +368,7 @@ useEffect(() => {
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ 
           emotion, 
+          emotions,
           access_token: accessToken 
         })
       });
@@ -338,6 +380,11 @@ useEffect(() => {
       const data = await response.json();
       setCurrentTracks(data.tracks || []);
       
+      if (data.emotion_quanta && data.emotion_vector) {
+        emotionQuantaRef.current = data.emotion_quanta;
+        lastEmotionKeyRef.current = emotionVectorKey(data.emotion_vector, data.emotion_quanta);
+      }
+      
       if (data.track_uris && data.track_uris.length > 0) {
         // Play the tracks
         await playTracks(data.track_uris);